@@ -1,3 +1,7 @@
+import asyncio
+import hmac
+import sys
+
 from pydantic import AnyHttpUrl
 
 from mcp.server.auth.provider import AccessToken, TokenVerifier
@@ -5,19 +9,26 @@ from mcp.server.auth.settings import AuthSettings
 from mcp.server.fastmcp import FastMCP
 
 
+_DEMO_TOKEN = b"demo-token"
+
+# The demo token always maps to the same identity, so the AccessToken is built once
+_DEMO_ACCESS_TOKEN = AccessToken(
+    token=_DEMO_TOKEN.decode("utf-8"),  # The actual token value
+    subject="demo-user",  # User identifier
+    client_id="demo-client",  # Client identifier
+    scopes=["user"],  # List of granted scopes
+    expires_at=None  # Never expires for demo (can be timestamp)
+)
+
+
 class SimpleTokenVerifier(TokenVerifier):
     """Simple token verifier for demonstration."""
 
     async def verify_token(self, token: str) -> AccessToken | None:
-        # Simple demonstration - accept any token that equals "demo-token"
-        if token == "demo-token":
-            return AccessToken(
-                token=token,  # The actual token value
-                subject="demo-user",  # User identifier
-                client_id="demo-client",  # Client identifier
-                scopes=["user"],  # List of granted scopes
-                expires_at=None  # Never expires for demo (can be timestamp)
-            )
+        # Simple demonstration - accept any token that equals "demo-token".
+        # Compare in constant time so even example code does not leak the token via timing.
+        if hmac.compare_digest(token.encode("utf-8"), _DEMO_TOKEN):
+            return _DEMO_ACCESS_TOKEN
         return None  # Invalid token
 
 
@@ -33,7 +44,9 @@ mcp = FastMCP(
         required_scopes=["user"],
     ),
     host="0.0.0.0",
-    port =3001
+    port =3001,
+    # No per-session state, so requests can be spread across worker processes
+    stateless_http=True,
 )
 
 
@@ -49,4 +62,7 @@ async def get_weather(city: str = "London") -> dict[str, str]:
 
 
 if __name__ == "__main__":
+    if sys.platform != "win32":
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     mcp.run(transport="streamable-http")
\ No newline at end of file
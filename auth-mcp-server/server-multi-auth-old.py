@@ -1,9 +1,19 @@
+import asyncio
+import hashlib
+import logging
 import os
 import re
+import sys
+import time
+import httpx
 import jwt
-import requests
+import orjson
+from collections import OrderedDict
+from contextvars import ContextVar
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from functools import cached_property, lru_cache, reduce
+from operator import or_
+from typing import Optional, Dict, Any, Iterable, Tuple
 from pydantic import AnyHttpUrl
 from fastapi import HTTPException
 
@@ -11,11 +21,170 @@ from mcp.server.auth.provider import AccessToken, TokenVerifier
 from mcp.server.auth.settings import AuthSettings
 from mcp.server.fastmcp import FastMCP
 
+logger = logging.getLogger("auth_mcp_server")
+
+class JWKSCache:
+    """
+    In-memory JSON Web Key Set, indexed by key ID (`kid`).
+
+    Keys are parsed into public key objects once per refresh, so verifying a
+    signature never refetches or reparses the JWKS. The key set is refreshed in
+    the background every `refresh_interval` seconds, and an unknown `kid` (key
+    rotation) triggers at most one refresh per `min_refresh_interval` seconds.
+    """
+
+    def __init__(self, jwks_uri: str, refresh_interval: float = 300.0, min_refresh_interval: float = 30.0):
+        self.jwks_uri = jwks_uri
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: Dict[str, Any] = {}
+        self._last_refresh = float("-inf")
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def get_key(self, kid: Optional[str]) -> Optional[Any]:
+        """Return the public key for `kid`, or None if the JWKS does not contain it."""
+        self._ensure_background_refresh()
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._last_refresh >= self.min_refresh_interval:
+            await self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    async def refresh(self) -> None:
+        """Fetch the JWKS and replace the cached keys."""
+        async with self._lock:
+            # Another request may have refreshed while we waited for the lock
+            if time.monotonic() - self._last_refresh < self.min_refresh_interval:
+                return
+            # Count attempts, not successes, so a failing endpoint is not hammered
+            self._last_refresh = time.monotonic()
+            try:
+                jwks = await self._fetch()
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning("JWKS refresh failed: %s", e)
+                return
+            keys = {}
+            for key_data in jwks.get("keys", []):
+                if not key_data.get("kid"):
+                    continue
+                try:
+                    keys[key_data["kid"]] = jwt.PyJWK(key_data).key
+                except jwt.PyJWTError:
+                    # Skip key types we cannot verify with
+                    continue
+            self._keys = keys
+
+    async def _fetch(self) -> Dict[str, Any]:
+        """Download the JWKS document without blocking the event loop."""
+        response = await jwks_http_client.get(self.jwks_uri)
+        response.raise_for_status()
+        return response.json()
+
+    def _ensure_background_refresh(self) -> None:
+        """Start the periodic refresh task on first use (it needs a running loop)."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_periodically())
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+# Bit assigned to each scope this server knows about, so scope checks are a single AND
+_SCOPE_BITS = {
+    "user": 1,
+    "weather:read": 2,
+    "weather:write": 4,
+    "admin": 8,
+}
+
+def _scope_mask(scopes: Iterable[str]) -> int:
+    """Bitmask of the known scopes in `scopes`; unknown scopes contribute no bits."""
+    return reduce(or_, (_SCOPE_BITS.get(scope, 0) for scope in scopes), 0)
+
+class ScopedAccessToken(AccessToken):
+    """AccessToken that remembers its scopes as a bitmask for repeated scope checks."""
+
+    @cached_property
+    def scope_mask(self) -> int:
+        return _scope_mask(self.scopes)
+
+@lru_cache(maxsize=None)
+def _required_scope_mask(required_scopes: Tuple[str, ...]) -> Optional[int]:
+    """Bitmask of the scopes a call site requires, or None if any of them has no bit."""
+    if any(scope not in _SCOPE_BITS for scope in required_scopes):
+        return None
+    return _scope_mask(required_scopes)
+
+# Token shapes recognised by MultiAuthTokenVerifier._classify
+TOKEN_JWT, TOKEN_API_KEY, TOKEN_OPAQUE, TOKEN_UNKNOWN = range(4)
+
+# Microsoft Graph scopes and the weather API scopes they grant
+_SCOPE_MAP = {
+    "User.Read": "weather:read",
+    "User.Write": "weather:write",
+}
+
+# JWT algorithms accepted with and without SSO signature verification
+SSO_SIGNED_ALGORITHMS = ["RS256"]
+SSO_UNSIGNED_ALGORITHMS = ["RS256", "HS256"]
+
+# Seconds of clock skew tolerated when checking SSO JWT expiry
+SSO_CLOCK_SKEW_LEEWAY = 30
+
+# Arbitrary safe bounds for OAuth opaque tokens
+OAUTH_TOKEN_MIN_LENGTH = 30
+OAUTH_TOKEN_MAX_LENGTH = 500
+
+class OrjsonPyJWT(jwt.PyJWT):
+    """PyJWT decoder that parses the claims payload with orjson instead of the stdlib json module."""
+
+    def _decode_payload(self, decoded: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            payload = orjson.loads(decoded["payload"])
+        except orjson.JSONDecodeError as e:
+            raise jwt.DecodeError(f"Invalid payload string: {e}") from e
+        if not isinstance(payload, dict):
+            raise jwt.DecodeError("Invalid payload string: must be a json object")
+        return payload
+
+jwt_decoder = OrjsonPyJWT()
+
+def _token_digest(token: str) -> bytes:
+    """Fixed-size BLAKE2b digest of a token, used as a lookup key instead of the raw secret."""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+# Pooled async client for JWKS refreshes: non-blocking and reuses TCP/TLS connections.
+# It lives as long as the process, like the cache that uses it.
+jwks_http_client = httpx.AsyncClient(timeout=5.0, limits=httpx.Limits(max_keepalive_connections=10))
+
+# Expected SSO token issuer; also the base of the authorization server URLs advertised to clients
+SSO_ISSUER = os.getenv("SSO_ISSUER", "https://sts.windows.net/72f988bf-86f1-41af-91ab-2d7cd011db47/")
+# Expected SSO token audience
+SSO_AUDIENCE = os.getenv("SSO_AUDIENCE", "api://auth-e6c1573d-3ea0-4392-b2c7-0cb5209f16f2")
+
+# Shared by every verifier instance so keys are fetched once per process
+sso_jwks_cache = JWKSCache(os.getenv("SSO_JWKS_URI", "https://login.microsoftonline.com/common/discovery/keys"))
+
 class MultiAuthTokenVerifier(TokenVerifier):
     """Multi-authentication token verifier supporting OAuth, SSO, and API Keys."""
 
-    def __init__(self):
-        """Initialize the verifier with configuration from environment variables."""
+    def __init__(self, cache_size: int = 4096, cache_ttl: float = 300.0):
+        """
+        Initialize the verifier with configuration from environment variables.
+
+        Args:
+            cache_size: Maximum number of verified tokens kept in the LRU cache
+            cache_ttl: Seconds a verified token is trusted without re-verification
+                (capped by the token's own expiry)
+        """
+        # Verified-token cache keyed by a BLAKE2b digest of the token, so plaintext
+        # secrets are never retained; values are (AccessToken, monotonic expiry)
+        self._token_cache: "OrderedDict[bytes, Tuple[AccessToken, float]]" = OrderedDict()
+        self._token_cache_size = cache_size
+        self._token_cache_ttl = cache_ttl
+
         # OAuth Configuration (for opaque tokens)
         self.oauth_access_token = {
                 "client_id": "oauth-client-1",
@@ -24,8 +193,10 @@ class MultiAuthTokenVerifier(TokenVerifier):
             }
         
         # SSO Configuration (expected issuer and audience for JWT validation)
-        self.sso_issuer = os.getenv("SSO_ISSUER", "https://sts.windows.net/72f988bf-86f1-41af-91ab-2d7cd011db47/")
-        self.sso_audience = os.getenv("SSO_AUDIENCE", "api://auth-e6c1573d-3ea0-4392-b2c7-0cb5209f16f2")
+        self.sso_issuer = SSO_ISSUER
+        self.sso_audience = SSO_AUDIENCE
+        # Signature verification against the JWKS is opt-in so the demo keeps accepting unsigned test tokens
+        self.sso_verify_signature = os.getenv("SSO_VERIFY_SIGNATURE", "false").lower() == "true"
         
         # API Key Configuration
         self.valid_api_keys = {
@@ -40,6 +211,18 @@ class MultiAuthTokenVerifier(TokenVerifier):
                 "subject": "api-admin"
             }
         }
+        # Access tokens prebuilt per API key and indexed by the key's digest, so a hit is a
+        # single lookup with nothing to construct; the digest computed once per request is
+        # shared with the verified-token cache
+        self._api_tokens_by_digest: Dict[bytes, ScopedAccessToken] = {
+            _token_digest(api_key): ScopedAccessToken(
+                token=api_key,
+                client_id=key_info["client_id"],
+                scopes=key_info["scopes"],
+                expires_at=None  # API keys don't expire in this demo
+            )
+            for api_key, key_info in self.valid_api_keys.items()
+        }
 
     async def verify_token(self, token: str) -> AccessToken | None:
         """
@@ -51,35 +234,78 @@ class MultiAuthTokenVerifier(TokenVerifier):
         Returns:
             AccessToken if valid, None if invalid
         """
-        # Try SSO JWT token verification first (if it looks like a JWT)
-        if self._is_jwt_token(token):
-            access_token = await self._verify_sso_jwt_token(token)
-            if access_token:
+        key = _token_digest(token)
+        cached = self._token_cache.get(key)
+        if cached is not None:
+            access_token, expires_at = cached
+            if time.monotonic() < expires_at:
+                self._token_cache.move_to_end(key)
                 return access_token
-            
-        # Try API Key verification
-        access_token = await self._verify_api_key(token)
-        if access_token:
-            return access_token
+            self._token_cache.pop(key, None)
 
-        # Try OAuth opaque token verification
-        access_token = await self._verify_oauth_token(token)
+        access_token = await self._verify_uncached(token, key)
         if access_token:
-            return access_token
+            self._cache_token(key, access_token)
+        return access_token
+
+    def _cache_token(self, key: bytes, access_token: AccessToken) -> None:
+        """Remember a verified token until the cache TTL or its own expiry, whichever is first."""
+        ttl = self._token_cache_ttl
+        if access_token.expires_at:
+            ttl = min(ttl, access_token.expires_at - time.time())
+        if ttl <= 0:
+            return
+        self._token_cache[key] = (access_token, time.monotonic() + ttl)
+        self._token_cache.move_to_end(key)
+        while len(self._token_cache) > self._token_cache_size:
+            self._token_cache.popitem(last=False)
+
+    async def _verify_uncached(self, token: str, digest: bytes) -> AccessToken | None:
+        """Route the token straight to the verifier matching its shape."""
+        kind = self._classify(token, digest)
+        if kind == TOKEN_API_KEY:
+            return self._verify_api_key(digest)
+        if kind == TOKEN_JWT:
+            access_token = await self._verify_sso_jwt_token(token)
+            if access_token:
+                return access_token
+            # A JWT that fails SSO validation is still a well-formed opaque token,
+            # so it gets the same presence check as any other OAuth token
+            return self._verify_oauth_token(token)
+        if kind == TOKEN_OPAQUE:
+            return self._verify_oauth_token(token)
 
         # Token not recognized by any method
         return None
 
+    def _classify(self, token: str, digest: bytes) -> int:
+        """
+        Classify a token by its shape so only one verifier has to run.
+
+        API keys are matched exactly by digest rather than by prefix, since the
+        keys themselves are configurable through the environment.
+        """
+        if digest in self._api_tokens_by_digest:
+            return TOKEN_API_KEY
+        if self._is_jwt_token(token):
+            return TOKEN_JWT
+        if OAUTH_TOKEN_MIN_LENGTH <= len(token) <= OAUTH_TOKEN_MAX_LENGTH:
+            return TOKEN_OPAQUE
+        return TOKEN_UNKNOWN
+
     def _is_jwt_token(self, token: str) -> bool:
         """Check if token appears to be a JWT (has 3 parts separated by dots)."""
-        return len(token.split('.')) == 3
+        # Counting separators avoids building a list of substrings on every request;
+        # anything shorter than 20 characters cannot hold a JWT header and payload,
+        # and a leading or trailing dot means an empty header or signature segment
+        return len(token) >= 20 and token.count('.') == 2 and token[0] != '.' and token[-1] != '.'
 
-    async def _verify_oauth_token(self, token: str) -> AccessToken | None:
+    def _verify_oauth_token(self, token: str) -> AccessToken | None:
         """Verify OAuth opaque tokens - just presence"""
-        if token != None and token != "" and not (len(token) < 30 or len(token) > 500):  # Arbitrary safe bounds
+        if token and OAUTH_TOKEN_MIN_LENGTH <= len(token) <= OAUTH_TOKEN_MAX_LENGTH:
             token_info = self.oauth_access_token
-            print("OAuth Token Verified Successfully")
-            return AccessToken(
+            logger.debug("OAuth Token Verified Successfully")
+            return ScopedAccessToken(
                 token=token,
                 client_id=token_info["client_id"],
                 scopes=token_info["scopes"],
@@ -90,13 +316,46 @@ class MultiAuthTokenVerifier(TokenVerifier):
     async def _verify_sso_jwt_token(self, token: str) -> AccessToken | None:
         """Verify SSO JWT tokens with specific validation requirements."""
         try:
-            # Decode JWT without signature verification for demo
-            # In production, you should verify the signature
-            decoded = jwt.decode(
-                token, 
-                options={"verify_signature": False},  # DO NOT USE IN PRODUCTION
-                algorithms=["RS256", "HS256"]
-            )
+            # Check the small header before touching the payload, so tokens with an
+            # unexpected algorithm (e.g. "none" or an alg switch) are rejected up front
+            algorithms = SSO_SIGNED_ALGORITHMS if self.sso_verify_signature else SSO_UNSIGNED_ALGORITHMS
+            header = jwt.get_unverified_header(token)
+            if header.get("alg") not in algorithms:
+                logger.debug("Unsupported JWT algorithm: %s", header.get("alg"))
+                return None
+
+            if self.sso_verify_signature:
+                # Look up the signing key by `kid` in the cached JWKS
+                kid = header.get("kid")
+                key = await sso_jwks_cache.get_key(kid)
+                if key is None:
+                    logger.debug("Unknown signing key: %s", kid)
+                    return None
+                decoded = jwt_decoder.decode(
+                    token,
+                    key=key,
+                    algorithms=algorithms,
+                    audience=self.sso_audience,
+                    issuer=self.sso_issuer,
+                    leeway=SSO_CLOCK_SKEW_LEEWAY
+                )
+            else:
+                # Decode JWT without signature verification for demo
+                # In production, set SSO_VERIFY_SIGNATURE=true to verify the signature
+                # Claim checks are off by default without a signature, so enable them explicitly
+                decoded = jwt_decoder.decode(
+                    token, 
+                    options={
+                        "verify_signature": False,  # DO NOT USE IN PRODUCTION
+                        "verify_aud": True,
+                        "verify_iss": True,
+                        "verify_exp": True,
+                    },
+                    algorithms=algorithms,
+                    audience=self.sso_audience,
+                    issuer=self.sso_issuer,
+                    leeway=SSO_CLOCK_SKEW_LEEWAY
+                )
             
             # Validate SSO-specific requirements
             if not self._validate_sso_jwt_claims(decoded):
@@ -108,17 +367,20 @@ class MultiAuthTokenVerifier(TokenVerifier):
             client_id = decoded.get("appid", decoded.get("azp", "sso-client"))
             
             # Convert Microsoft scopes to weather scopes
-            scp_scopes = decoded.get("scp", "").split() if "scp" in decoded else []
+            # One claim lookup; absent or empty scp skips the split entirely
+            scp = decoded.get("scp")
+            scp_scopes = scp.split() if scp else ()
             scopes = self._convert_microsoft_scopes_to_weather_scopes(scp_scopes)
             
             expires_at = decoded.get("exp")
             
-            print("SSO JWT Token Verified Successfully")
-            print(f"User: {decoded.get('name', 'Unknown')}")
-            print(f"OID: {oid}")
-            print(f"Converted scopes: {scopes}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "SSO JWT Token Verified Successfully (user=%s, oid=%s, scopes=%s)",
+                    decoded.get("name", "Unknown"), oid, scopes
+                )
 
-            return AccessToken(
+            return ScopedAccessToken(
                 token=token,
                 client_id=client_id,
                 scopes=scopes,
@@ -126,81 +388,45 @@ class MultiAuthTokenVerifier(TokenVerifier):
             )
 
         except jwt.InvalidTokenError as e:
-            print(f"JWT Token validation failed: {e}")
+            logger.debug("JWT Token validation failed: %s", e)
             return None
 
     def _validate_sso_jwt_claims(self, decoded: Dict[str, Any]) -> bool:
-        """Validate JWT claims for SSO tokens with specific requirements."""
-        # Check issuer (iss)
-        if decoded.get("iss") != self.sso_issuer:
-            print(f"Invalid issuer: {decoded.get('iss')} != {self.sso_issuer}")
-            return False
-            
-        # Check audience (aud)
-        aud = decoded.get("aud")
-        if isinstance(aud, list):
-            if self.sso_audience not in aud:
-                print(f"Invalid audience: {self.sso_audience} not in {aud}")
-                return False
-        elif aud != self.sso_audience:
-            print(f"Invalid audience: {aud} != {self.sso_audience}")
-            return False
-            
+        """Validate the SSO claims jwt.decode does not check itself (iss, aud and exp are checked there)."""
         # Check presence of oid (Object ID)
         if not decoded.get("oid"):
-            print("Missing required claim: oid")
-            return False
-            
-        # Check expiration
-        exp = decoded.get("exp")
-        print(exp)
-        print(datetime.fromtimestamp(exp, tz=timezone.utc))
-        print(datetime.now(tz=timezone.utc))
-        if exp and datetime.fromtimestamp(exp, tz=timezone.utc) < datetime.now(tz=timezone.utc):
-            print("Token has expired")
+            logger.debug("Missing required claim: oid")
             return False
             
         return True
 
-    def _convert_microsoft_scopes_to_weather_scopes(self, scp_scopes: list[str]) -> list[str]:
+    def _convert_microsoft_scopes_to_weather_scopes(self, scp_scopes: Iterable[str]) -> list[str]:
         """Convert Microsoft Graph scopes to weather API scopes."""
-        weather_scopes = ["user"]  # Always include user scope
-        
-        for scope in scp_scopes:
-            if scope == "User.Read":
-                weather_scopes.append("weather:read")
-            elif scope == "User.Write":
-                weather_scopes.append("weather:write")
-        
-        return list(set(weather_scopes))  # Remove duplicates
-
-    async def _verify_api_key(self, token: str) -> AccessToken | None:
-        """Verify API Key authentication."""
-        if token in self.valid_api_keys:
-            key_info = self.valid_api_keys[token]
-            print("API Key Verified Successfully")
-            return AccessToken(
-                token=token,
-                client_id=key_info["client_id"],
-                scopes=key_info["scopes"],
-                expires_at=None  # API keys don't expire in this demo
-            )
-        return None
+        # Always include user scope; the set literal removes duplicates
+        return list({"user", *(_SCOPE_MAP[scope] for scope in scp_scopes if scope in _SCOPE_MAP)})
+
+    def _verify_api_key(self, digest: bytes) -> AccessToken | None:
+        """Verify API Key authentication by the token's digest."""
+        access_token = self._api_tokens_by_digest.get(digest)
+        if access_token is not None:
+            logger.debug("API Key Verified Successfully")
+        return access_token
 
 # Create a global instance to access current user context
 token_verifier = MultiAuthTokenVerifier()
 
 class AuthContext:
-    """Thread-local storage for current user context."""
-    _current_user: Optional[AccessToken] = None
+    """Task-local storage for current user context."""
+    # Each request task sees its own user, so concurrent requests never overwrite each other
+    _current_user: ContextVar[Optional[AccessToken]] = ContextVar("current_user", default=None)
     
     @classmethod
     def set_current_user(cls, user: AccessToken):
-        cls._current_user = user
+        cls._current_user.set(user)
     
     @classmethod
     def get_current_user(cls) -> Optional[AccessToken]:
-        return cls._current_user
+        return cls._current_user.get()
     
     @classmethod
     def require_scopes(cls, *required_scopes: str) -> AccessToken:
@@ -209,8 +435,16 @@ class AuthContext:
         if not current_user:
             raise HTTPException(status_code=401, detail="Authentication required")
         
-        user_scopes = set(current_user.scopes)
-        missing_scopes = set(required_scopes) - user_scopes
+        required_mask = _required_scope_mask(required_scopes)
+        if (
+            required_mask is not None
+            and isinstance(current_user, ScopedAccessToken)
+            and current_user.scope_mask & required_mask == required_mask
+        ):
+            return current_user
+        
+        # Slow path: unknown scopes, plain AccessTokens, and building the error message
+        missing_scopes = set(required_scopes).difference(current_user.scopes)
         
         if missing_scopes:
             raise HTTPException(
@@ -237,27 +471,33 @@ mcp = FastMCP(
     token_verifier=ContextAwareTokenVerifier(),
     # Auth settings for RFC 9728 Protected Resource Metadata
     auth=AuthSettings(
-        issuer_url=AnyHttpUrl(os.getenv("SSO_ISSUER", "https://sts.windows.net/72f988bf-86f1-41af-91ab-2d7cd011db47/")),
+        issuer_url=AnyHttpUrl(SSO_ISSUER),
         resource_server_url=AnyHttpUrl(f"http://0.0.0.0:3001/mcp"),
         required_scopes=["user"],
         # Additional metadata for clients
-        token_endpoint=AnyHttpUrl(f"{os.getenv('SSO_ISSUER', 'https://sts.windows.net/72f988bf-86f1-41af-91ab-2d7cd011db47/')}/oauth2/v2.0/token"),
-        authorization_endpoint=AnyHttpUrl(f"{os.getenv('SSO_ISSUER', 'https://sts.windows.net/72f988bf-86f1-41af-91ab-2d7cd011db47/')}/oauth2/v2.0/authorize"),
+        token_endpoint=AnyHttpUrl(f"{SSO_ISSUER}/oauth2/v2.0/token"),
+        authorization_endpoint=AnyHttpUrl(f"{SSO_ISSUER}/oauth2/v2.0/authorize"),
     ),
     host="0.0.0.0",
     port=3001
 )
 
+# Everything in the weather response except the city is fixed
+_WEATHER_TEMPLATE = {
+    "temperature": "22",
+    "condition": "Partly cloudy",
+    "humidity": "65%",
+    "auth_method": "Multi-auth supported"
+}
+
 @mcp.tool()
 async def get_weather(city: str = "London") -> dict[str, str]:
     """Get weather data for a city."""
-    return {
-        "city": city,
-        "temperature": "22",
-        "condition": "Partly cloudy",
-        "humidity": "65%",
-        "auth_method": "Multi-auth supported"
-    }
+    return {"city": city, **_WEATHER_TEMPLATE}
+
+# Forecast temperatures are deterministic, so their strings are built once at import
+_TEMP_STRS = tuple(sys.intern(str(20+i)) for i in range(365))
+_SUNNY = sys.intern("Sunny")
 
 @mcp.tool()
 async def get_forecast(city: str = "London", days: int = 5) -> dict[str, Any]:
@@ -269,7 +509,7 @@ async def get_forecast(city: str = "London", days: int = 5) -> dict[str, Any]:
         "city": city,
         "days": days,
         "forecast": [
-            {"day": i+1, "temperature": f"{20+i}", "condition": "Sunny"}
+            {"day": i+1, "temperature": _TEMP_STRS[i] if i < len(_TEMP_STRS) else str(20+i), "condition": _SUNNY}
             for i in range(days)
         ],
         "authorized_user": current_user.client_id
@@ -283,6 +523,8 @@ async def update_weather_station(station_id: str, data: dict = None) -> dict[str
     """
     # Check if user has required scope
     current_user = AuthContext.require_scopes("weather:write")
+    # One timestamp for the whole response, to the second
+    now = datetime.now(timezone.utc).isoformat(timespec="seconds")
     
     if data is None:
         data = {
@@ -291,13 +533,13 @@ async def update_weather_station(station_id: str, data: dict = None) -> dict[str
             "pressure": 1013.2,
             "wind_speed": 12.3,
             "wind_direction": "NW",
-            "last_updated": datetime.now(timezone.utc).isoformat()
+            "last_updated": now
         }
     
     return {
         "station_id": station_id,
         "status": "updated",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now,
         "message": "Weather station data updated successfully",
         "updated_by": current_user.client_id,
         "client_id": current_user.client_id
@@ -310,4 +552,7 @@ if __name__ == "__main__":
     print("  - SSO JWT tokens (Azure AD)")
     print("  - API Keys")
     print(f"Server running on http://0.0.0.0:3001/mcp")
+    if sys.platform != "win32":
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     mcp.run(transport="streamable-http")
\ No newline at end of file
@@ -1,40 +1,186 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
+from collections import OrderedDict
+from dataclasses import dataclass
+import asyncio
+import base64
+import functools
+import hashlib
+import hmac
 import json
+import logging
 import os
+import sys
+import time
 from pathlib import Path
+import httpx
+from authlib.jose import JsonWebKey
 from fastmcp import FastMCP
 from fastmcp.server.auth.providers.jwt import JWTVerifier
 from fastmcp.server.auth import TokenVerifier, AccessToken
 
+# Per-request diagnostics go through logging so they cost nothing unless DEBUG is enabled
+logger = logging.getLogger("auth_mcp_server")
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    """Bounds for the verified-token cache used by OrAuthVerifier."""
+
+    max_size: int = 10_000
+    ttl: float = 5.0
+
+
+def _unverified_claims(token: str) -> Dict[str, Any]:
+    """Decode a JWT payload without verifying it; return {} for opaque or malformed tokens.
+
+    Only used to route a token to the verifier that can possibly accept it; the
+    chosen verifier still performs full signature and claim validation.
+    """
+    parts = token.split(".", 2)
+    if len(parts) != 3:
+        return {}
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(parts[1] + "=="))
+    except Exception:
+        # The payload is attacker-controlled (e.g. deeply nested arrays raise
+        # RecursionError); a routing hint must never fail the request
+        return {}
+    return claims if isinstance(claims, dict) else {}
+
+
+class ClaimsRoutedVerifier(TokenVerifier):
+    """Verifier that can tell from a token's unverified claims whether it could accept it.
+
+    OrAuthVerifier decodes a token's payload once, skips the children whose
+    `accepts` is False, and passes the claims to `verify_claims` so they are
+    not decoded again. `accepts` sees attacker-controlled input and must not raise.
+    """
+
+    def accepts(self, claims: Dict[str, Any]) -> bool:
+        raise NotImplementedError
+
+    async def verify_claims(self, token: str, claims: Dict[str, Any]) -> Optional[AccessToken]:
+        raise NotImplementedError
+
+    async def verify_token(self, token: str) -> Optional[AccessToken]:
+        claims = _unverified_claims(token)
+        if not self.accepts(claims):
+            return None
+        return await self.verify_claims(token, claims)
+
+
 # Custom OR-composite verifier that succeeds if any child verifier succeeds
 class OrAuthVerifier(TokenVerifier):
-    """Composite verifier that accepts a token if any child accepts it."""
+    """Composite verifier that accepts a token if any child accepts it.
+
+    When ``verification_cache`` is given, successfully verified tokens are kept
+    in a bounded LRU keyed by the SHA-256 digest of the token (the raw token is
+    never stored), so repeated requests with the same bearer token skip the
+    child verifiers until the cache TTL or the token's own expiry is reached.
+    Rejected tokens are never cached.
+    """
 
-    def __init__(self, *verifiers: TokenVerifier, required_scopes: list[str] | None = None):
-        print("Initializing OrAuthVerifier with multiple verifiers...")
+    def __init__(
+        self,
+        *verifiers: TokenVerifier,
+        required_scopes: list[str] | None = None,
+        verification_cache: CacheConfig | None = None,
+    ):
+        logger.debug("Initializing OrAuthVerifier with %d verifiers", len(verifiers))
         super().__init__(required_scopes=required_scopes)
         self.verifiers = verifiers
+        self._required_frozen = frozenset(required_scopes) if required_scopes else None
+        self._cache_config = verification_cache
+        # Only touched by synchronous code between awaits, so no lock is needed
+        self._cache: OrderedDict[bytes, tuple[float, AccessToken]] = OrderedDict()
 
     async def verify_token(self, token: str) -> Optional[AccessToken]:
-        for v in self.verifiers:
-            try:
-                print(f"Verifying token with {v}...")
+        if self._cache_config is None:
+            return await self._verify_with_children(token)
+
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        now = time.time()
+        entry = self._cache.get(key)
+        if entry is not None:
+            deadline, cached = entry
+            if now < deadline and (cached.expires_at is None or now < cached.expires_at):
+                self._cache.move_to_end(key)
+                return cached
+            self._cache.pop(key, None)
+
+        result = await self._verify_with_children(token)
+        if result is not None:
+            deadline = now + self._cache_config.ttl
+            if result.expires_at is not None:
+                deadline = min(deadline, result.expires_at)
+            self._cache[key] = (deadline, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_config.max_size:
+                self._cache.popitem(last=False)
+        return result
+
+    async def _verify_with_children(self, token: str) -> Optional[AccessToken]:
+        """Return a child verification result that satisfies the required scopes.
+
+        The token's unverified claims are decoded once and used to route it to the
+        children that can possibly accept it (e.g. only the API key verifier for an
+        opaque token); those candidates are raced concurrently, so a token costs
+        the slowest verifier's latency rather than the sum of all of them.
+        """
+        claims = _unverified_claims(token)
+        candidates = tuple(
+            v for v in self.verifiers
+            if not isinstance(v, ClaimsRoutedVerifier) or v.accepts(claims)
+        )
+        return await self._race(candidates, token, claims)
+
+    async def _verify_with(self, v: TokenVerifier, token: str, claims: Dict[str, Any]) -> Optional[AccessToken]:
+        """Run one child verifier, returning its result only if it has the required scopes."""
+        try:
+            logger.debug("Verifying token with %s", v)
+            if isinstance(v, ClaimsRoutedVerifier):
+                result = await v.verify_claims(token, claims)
+            else:
                 result = await v.verify_token(token)
-            except Exception:
-                result = None
-            if result is not None:
-                print(f"Token verified successfully by {v}. Result: {result}")
-                # If this composite has required scopes, enforce them here
-                if self.required_scopes:
-                    token_scopes = set(result.scopes)
-                    required = set(self.required_scopes)
-                    if not required.issubset(token_scopes):
-                        continue
-                return result
+        except Exception as e:
+            # A verifier that fails on a token rejects it; the request must get a 401,
+            # not a 500. Routing keeps this path off the common "wrong provider" case.
+            logger.debug("Verifier %s rejected token: %s", v, e)
+            return None
+        if result is None:
+            return None
+        logger.debug("Token verified successfully by %s. Result: %s", v, result)
+        # If this composite has required scopes, enforce them here
+        if self._required_frozen and not self._required_frozen.issubset(result.scopes):
+            return None
+        return result
+
+    async def _race(
+        self, verifiers: tuple[TokenVerifier, ...], token: str, claims: Dict[str, Any]
+    ) -> Optional[AccessToken]:
+        """Run the verifiers concurrently and return the first acceptable result.
+
+        Results are taken in the order the verifiers were given, not the order they
+        finish, so a token that two children would accept always gets the same
+        AccessToken. Lower-priority tasks still run while a higher one is awaited.
+        """
+        if not verifiers:
+            return None
+        if len(verifiers) == 1:
+            return await self._verify_with(verifiers[0], token, claims)
+        tasks = [asyncio.create_task(self._verify_with(v, token, claims)) for v in verifiers]
+        try:
+            for task in tasks:
+                result = await task
+                if result is not None:
+                    return result
+        finally:
+            for task in tasks:
+                task.cancel()
         return None
 
 # Add a simple API Key verifier that checks the token equals a configured API key
-class ApiKeyVerifier(TokenVerifier):
+class ApiKeyVerifier(ClaimsRoutedVerifier):
     """Simple API Key verifier initialized with a single API key string.
 
     This verifier will accept a bearer token if and only if the token string
@@ -46,45 +192,223 @@ class ApiKeyVerifier(TokenVerifier):
         # No special resource server URL or global required_scopes are used
         super().__init__()
         self.api_key = api_key
+        # Encoded once so each request only pays for the constant-time compare
+        self._api_key_bytes = api_key.encode("utf-8")
+        # A token can only equal the key if its unverified claims equal the key's
+        # ({} for an opaque key), which lets JWTs skip this verifier entirely
+        self._api_key_claims = _unverified_claims(api_key)
         # Provide some default metadata for the API key client
         self.client_id = "api-key-client"
         self.scopes = ["user"]
+        # Every successful match describes the same client, so the token is built once
+        self._access_token = AccessToken(
+            token=api_key,
+            client_id=self.client_id,
+            scopes=self.scopes,
+            expires_at=None,
+        )
 
     async def verify_token(self, token: str) -> Optional[AccessToken]:
         """Return an AccessToken when the provided token matches the configured API key."""
-        if token == self.api_key:
-            print("API Key verified successfully")
-            return AccessToken(
-                token=token,
-                client_id=self.client_id,
-                scopes=self.scopes,
-                expires_at=None,
-            )
+        if not isinstance(token, str):
+            return None
+        # Constant-time comparison so response latency does not leak key prefixes
+        if hmac.compare_digest(token.encode("utf-8"), self._api_key_bytes):
+            logger.debug("API Key verified successfully")
+            return self._access_token
         return None
 
-ms_sso_verifier = JWTVerifier(
-    jwks_uri="https://login.microsoftonline.com/common/discovery/keys",
-    issuer="https://login.microsoftonline.com/72f988bf-86f1-41af-91ab-2d7cd011db47/v2.0",
-    audience="b232067f-2258-4389-84e7-9705dc203634",
-    required_scopes=["User.Read"]
-)
+    def accepts(self, claims: Dict[str, Any]) -> bool:
+        return claims == self._api_key_claims
 
-adobe_oauth_verifier = JWTVerifier(
-    jwks_uri="https://ims-na1.adobelogin.com/ims/keys",
-    # Adobe JWT does NOT contain any issuer or audience, so we verify only scopes
-    # required_scopes=["AdobeID", "openid", "email"],
-    # Due to a bug in the JWTVerifier code, the scopes string is NOT split at commas - so bypassing scopes check for now. Will update once the issue is fixed in FastMCP package.
+    async def verify_claims(self, token: str, claims: Dict[str, Any]) -> Optional[AccessToken]:
+        return await self.verify_token(token)
+
+class JWKSCache:
+    """Process-wide cache of parsed JWKS public keys, keyed by JWKS URI and key id.
+
+    Every verifier pointing at the same JWKS URI shares one key set and one
+    pooled HTTP client, so key material is fetched once per rotation instead of
+    once per verifier, and fetches reuse kept-alive TLS connections.
+    """
+
+    # Minimum seconds between refreshes triggered by an unknown `kid`, so a burst
+    # of tokens with a bogus key id cannot hammer the identity provider
+    MIN_REFRESH_INTERVAL = 60.0
+
+    def __init__(self, client: httpx.AsyncClient, ttl: float = 3600.0):
+        self._client = client
+        self._ttl = ttl
+        self._keys: Dict[str, tuple[float, Dict[str, Any]]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get_key(self, jwks_uri: str, kid: str | None) -> Any:
+        """Return the public key for `kid`, refreshing the key set at most once if needed."""
+        keys = self._lookup(jwks_uri, kid)
+        if keys is None:
+            lock = self._locks.setdefault(jwks_uri, asyncio.Lock())
+            async with lock:
+                # Another request may have refreshed the key set while we waited
+                keys = self._lookup(jwks_uri, kid)
+                if keys is None:
+                    keys = await self._refresh(jwks_uri)
+
+        if kid is None:
+            if len(keys) == 1:
+                return next(iter(keys.values()))
+            raise ValueError("Token has no 'kid' and the JWKS holds multiple keys")
+        if kid not in keys:
+            raise ValueError(f"Key ID '{kid}' not found in JWKS")
+        return keys[kid]
+
+    def _lookup(self, jwks_uri: str, kid: str | None) -> Dict[str, Any] | None:
+        """Return the cached key set if it can answer for `kid` without a refresh."""
+        entry = self._keys.get(jwks_uri)
+        if entry is None:
+            return None
+        age = time.time() - entry[0]
+        if age >= self._ttl:
+            return None
+        # Unknown key id usually means the provider rotated keys: allow a refresh
+        if kid is not None and kid not in entry[1] and age >= self.MIN_REFRESH_INTERVAL:
+            return None
+        return entry[1]
+
+    async def _refresh(self, jwks_uri: str) -> Dict[str, Any]:
+        """Fetch the JWKS document and parse each key once.
+
+        Keys are stored as authlib key objects, the form JWTVerifier's decoder
+        consumes directly, so no key wrapping or parsing happens per token.
+        """
+        response = await self._client.get(jwks_uri)
+        response.raise_for_status()
+        keys: Dict[str, Any] = {}
+        for key_data in response.json().get("keys", []):
+            try:
+                keys[key_data.get("kid") or "_default"] = JsonWebKey.import_key(key_data)
+            except (KeyError, ValueError):
+                # Skip key types this server cannot verify with, and malformed keys
+                continue
+        self._keys[jwks_uri] = (time.time(), keys)
+        return keys
+
+
+# One pooled client for all JWKS traffic, shared by every JWT verifier below
+jwks_http_client = httpx.AsyncClient(
+    timeout=10.0,
+    limits=httpx.Limits(max_keepalive_connections=32),
 )
+jwks_cache = JWKSCache(jwks_http_client)
+
+
+class SharedJWKSVerifier(JWTVerifier):
+    """JWTVerifier that resolves signing keys through the process-wide JWKS cache.
+
+    Overrides JWTVerifier's per-instance JWKS lookup; signature and claim
+    validation are unchanged.
+    """
+
+    async def _get_jwks_key(self, kid: str | None) -> Any:
+        return await jwks_cache.get_key(self.jwks_uri, kid)
+
+
+class MultiAudienceJWTVerifier(ClaimsRoutedVerifier):
+    """Verifier for several apps that share one JWKS source but differ by audience.
+
+    The unverified `aud` claim selects the per-audience rules (issuer, required
+    scopes), so each token gets at most one signature check, and a token for an
+    unknown audience is rejected without any crypto work.
+    """
+
+    def __init__(self, jwks_uri: str, audiences: Dict[str, Dict[str, Any]]):
+        super().__init__()
+        self.jwks_uri = jwks_uri
+        self._by_audience: Dict[str, SharedJWKSVerifier] = {
+            audience: SharedJWKSVerifier(jwks_uri=jwks_uri, audience=audience, **options)
+            for audience, options in audiences.items()
+        }
+
+    def _audience_verifiers(self, claims: Dict[str, Any]) -> list[SharedJWKSVerifier]:
+        """Return the verifiers for the known audiences named by the unverified `aud` claim."""
+        aud = claims.get("aud")
+        # `aud` is attacker-controlled until verified: only a string or a list can match
+        if isinstance(aud, str):
+            audiences = [aud]
+        elif isinstance(aud, list):
+            audiences = aud
+        else:
+            return []
+        return [
+            self._by_audience[audience]
+            for audience in audiences
+            if isinstance(audience, str) and audience in self._by_audience
+        ]
+
+    def accepts(self, claims: Dict[str, Any]) -> bool:
+        return bool(self._audience_verifiers(claims))
+
+    async def verify_claims(self, token: str, claims: Dict[str, Any]) -> Optional[AccessToken]:
+        for audience_verifier in self._audience_verifiers(claims):
+            result = await audience_verifier.verify_token(token)
+            if result is not None:
+                return result
+        return None
 
-entra_oauth_verifier = JWTVerifier(
+
+class PrefilteredVerifier(ClaimsRoutedVerifier):
+    """Wraps a verifier and only calls it for JWTs whose unverified claims pass `matches`.
+
+    Lets a verifier that cannot pin an issuer skip tokens that are obviously
+    meant for another provider instead of spending a signature check on them.
+    """
+
+    def __init__(self, inner: TokenVerifier, matches: Callable[[Dict[str, Any]], bool]):
+        super().__init__(required_scopes=inner.required_scopes)
+        self.inner = inner
+        self.matches = matches
+
+    def accepts(self, claims: Dict[str, Any]) -> bool:
+        return bool(claims) and bool(self.matches(claims))
+
+    async def verify_claims(self, token: str, claims: Dict[str, Any]) -> Optional[AccessToken]:
+        return await self.inner.verify_token(token)
+
+
+# Microsoft SSO and Entra OAuth tokens are both signed with the common Microsoft keys
+microsoft_verifier = MultiAudienceJWTVerifier(
     jwks_uri="https://login.microsoftonline.com/common/discovery/keys",
-    audience="3a4f4d9b-3ae6-4bbe-b665-409dccf95599", 
-    required_scopes=["MCPTools.Invoke"]
+    audiences={
+        # Microsoft SSO
+        "b232067f-2258-4389-84e7-9705dc203634": {
+            "issuer": "https://login.microsoftonline.com/72f988bf-86f1-41af-91ab-2d7cd011db47/v2.0",
+            "required_scopes": ["User.Read"],
+        },
+        # Entra OAuth
+        "3a4f4d9b-3ae6-4bbe-b665-409dccf95599": {
+            "required_scopes": ["MCPTools.Invoke"],
+        },
+    },
+)
+
+adobe_oauth_verifier = PrefilteredVerifier(
+    SharedJWKSVerifier(
+        jwks_uri="https://ims-na1.adobelogin.com/ims/keys",
+        # Adobe JWT does NOT contain any issuer or audience, so we verify only scopes
+        # required_scopes=["AdobeID", "openid", "email"],
+        # Due to a bug in the JWTVerifier code, the scopes string is NOT split at commas - so bypassing scopes check for now. Will update once the issue is fixed in FastMCP package.
+    ),
+    # Skip tokens issued by anyone else (e.g. Microsoft) instead of failing their signature check
+    matches=lambda claims: claims.get("iss") is None or "adobelogin.com" in str(claims.get("iss")),
 )
 
 api_key_verifier = ApiKeyVerifier("mock_mcp_api_key")
 
-verifier = OrAuthVerifier(ms_sso_verifier, adobe_oauth_verifier, entra_oauth_verifier, api_key_verifier)
+verifier = OrAuthVerifier(
+    microsoft_verifier,
+    adobe_oauth_verifier,
+    api_key_verifier,
+    verification_cache=CacheConfig(),
+)
 
 mcp = FastMCP(name="Protected API", auth=verifier, host="0.0.0.0", port=3001, stateless_http=True)
 # mcp = FastMCP(name="Protected API", host="0.0.0.0", port=3001)
@@ -92,7 +416,7 @@ mcp = FastMCP(name="Protected API", auth=verifier, host="0.0.0.0", port=3001, st
 @mcp.tool()
 async def get_weather(city: str) -> dict[str, str]:
     """Get weather data for a city."""
-    print(f"Fetching weather for {city}...")
+    logger.debug("Fetching weather for %s", city)
     return {
         "city": city,
         "temperature": "22",
@@ -101,17 +425,27 @@ async def get_weather(city: str) -> dict[str, str]:
         "auth_method": "Multi-auth supported"
     }
 
+# Forecast entries are deterministic, so common horizons are sliced from a prebuilt list.
+# The entries are shared between responses and must not be mutated.
+_FORECAST_TEMPLATE = [
+    {"day": i+1, "temperature": str(20+i), "condition": "Sunny"}
+    for i in range(64)
+]
+
 @mcp.tool()
 async def get_forecast(city: str, days: int) -> dict[str, Any]:
     """Get weather forecast for a city"""
-    print(f"Fetching weather forecast for {city} for {days} days...")
+    logger.debug("Fetching weather forecast for %s for %s days", city, days)
+    forecast = _FORECAST_TEMPLATE[:max(days, 0)]
+    if days > len(_FORECAST_TEMPLATE):
+        forecast = forecast + [
+            {"day": i+1, "temperature": str(20+i), "condition": "Sunny"}
+            for i in range(len(_FORECAST_TEMPLATE), days)
+        ]
     return {
         "city": city,
         "days": days,
-        "forecast": [
-            {"day": i+1, "temperature": f"{20+i}", "condition": "Sunny"}
-            for i in range(days)
-        ]
+        "forecast": forecast
     }
 
 # Load metadata for document search and retrieval
@@ -119,6 +453,9 @@ SCRIPT_DIR = Path(__file__).parent
 METADATA_FILE = SCRIPT_DIR / "metadata.json"
 DOCS_DIR = SCRIPT_DIR / "docs"
 
+# Compact separators keep the serialized tool responses as small as possible
+JSON_SEPARATORS = (",", ":")
+
 def load_metadata():
     """Load document metadata from metadata.json file."""
     try:
@@ -139,6 +476,58 @@ def load_document_content(filename: str) -> str:
         print(f"Error loading document {filename}: {e}")
         return ""
 
+def build_searchable_text(doc: Dict[str, Any]) -> str:
+    """Return the lowercased text a document is searched by."""
+    # Search in title, summary, tags, category, and key topics
+    searchable_text = " ".join([
+        doc.get("title", ""),
+        doc.get("summary", ""),
+        doc.get("category", ""),
+        " ".join(doc.get("tags", [])),
+        " ".join(doc.get("key_topics", []))
+    ])
+
+    # Also search document content for more thorough results
+    if doc.get("filename"):
+        searchable_text += " " + DOC_TEXT[doc.get("id")]
+
+    return searchable_text.lower()
+
+# Metadata and document text are immutable, so they are read from disk once at startup:
+# metadata by id (in metadata.json order) and the full text of each document by id
+DOC_META: Dict[str, Dict[str, Any]] = {doc.get("id"): doc for doc in load_metadata()}
+DOC_TEXT: Dict[str, str] = {
+    doc_id: load_document_content(doc["filename"]) if doc.get("filename") else ""
+    for doc_id, doc in DOC_META.items()
+}
+# Lowercased searchable text per document, built once rather than per query
+DOC_SEARCHABLE: Dict[str, str] = {
+    doc_id: build_searchable_text(doc) for doc_id, doc in DOC_META.items()
+}
+
+@functools.lru_cache(maxsize=1024)
+def _search_json(query_lower: str) -> str:
+    """Return the JSON-encoded search results for an already-lowercased query.
+
+    Documents never change after startup, so results are memoized per query.
+    """
+    # Simple keyword-based search: a document matches if every query word occurs
+    # anywhere in its searchable text (substring match, so "secur" finds "security")
+    query_words = query_lower.split()
+    results = [
+        {
+            "id": doc_id,
+            "title": DOC_META[doc_id].get("title"),
+            "url": DOC_META[doc_id].get("url")
+        }
+        for doc_id, searchable_text in DOC_SEARCHABLE.items()
+        if all(word in searchable_text for word in query_words)
+    ]
+
+    # Return as JSON-encoded string in a results array
+    response = {"results": results}
+    return json.dumps(response, separators=JSON_SEPARATORS)
+
 @mcp.tool()
 async def search(query: str) -> str:
     """
@@ -150,41 +539,28 @@ async def search(query: str) -> str:
     Returns:
         A JSON-encoded string containing search results with id, title, and url fields.
     """
-    print(f"Searching for: {query}")
-    
-    # Load metadata
-    documents = load_metadata()
-    
-    # Simple keyword-based search across multiple fields
-    query_words = query.lower().split()
-    results = []
-    
-    for doc in documents:
-        # Search in title, summary, tags, category, and key topics
-        searchable_text = " ".join([
-            doc.get("title", ""),
-            doc.get("summary", ""),
-            doc.get("category", ""),
-            " ".join(doc.get("tags", [])),
-            " ".join(doc.get("key_topics", []))
-        ]).lower()
-        
-        # Also load and search document content for more thorough results
-        if doc.get("filename"):
-            content = load_document_content(doc["filename"])
-            searchable_text += " " + content.lower()
-        
-        # Check if all query words appear in searchable text
-        if all(word in searchable_text for word in query_words):
-            results.append({
-                "id": doc.get("id"),
-                "title": doc.get("title"),
-                "url": doc.get("url")
-            })
-    
-    # Return as JSON-encoded string in a results array
-    response = {"results": results}
-    return json.dumps(response)
+    logger.debug("Searching for: %s", query)
+    return _search_json(query.lower())
+
+def build_fetch_response(document_meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the fetch response for a document from its metadata and full text."""
+    # Construct response with document metadata and content
+    return {
+        "id": document_meta.get("id"),
+        "title": document_meta.get("title"),
+        "text": DOC_TEXT[document_meta.get("id")],
+        "url": document_meta.get("url"),
+        "metadata": {
+            "category": document_meta.get("category"),
+            "tags": document_meta.get("tags", []),
+            "summary": document_meta.get("summary")
+        }
+    }
+
+# Documents are read-only, so every fetch response is serialized once at startup
+FETCH_JSON: Dict[str, str] = {
+    doc_id: json.dumps(build_fetch_response(doc), separators=JSON_SEPARATORS) for doc_id, doc in DOC_META.items()
+}
 
 @mcp.tool()
 async def fetch(id: str) -> str:
@@ -197,43 +573,23 @@ async def fetch(id: str) -> str:
     Returns:
         A JSON-encoded string containing the full document with id, title, text, url, and metadata fields.
     """
-    print(f"Fetching document: {id}")
-    
-    # Load metadata
-    documents = load_metadata()
-    
-    # Find document by ID
-    document_meta = None
-    for doc in documents:
-        if doc.get("id") == id:
-            document_meta = doc
-            break
-    
-    if document_meta is None:
+    logger.debug("Fetching document: %s", id)
+
+    response = FETCH_JSON.get(id)
+    if response is None:
         # Return error message if document not found
         return json.dumps({
             "error": f"Document with id '{id}' not found",
             "id": id
-        })
-    
-    # Load the full document content
-    text = load_document_content(document_meta.get("filename", ""))
-    
-    # Construct response with document metadata and content
-    response = {
-        "id": document_meta.get("id"),
-        "title": document_meta.get("title"),
-        "text": text,
-        "url": document_meta.get("url"),
-        "metadata": {
-            "category": document_meta.get("category"),
-            "tags": document_meta.get("tags", []),
-            "summary": document_meta.get("summary")
-        }
-    }
-    
+        }, separators=JSON_SEPARATORS)
+
     # Return the full document as JSON-encoded string
-    return json.dumps(response)
+    return response
+
+# ASGI app for multi-process serving, e.g.
+# `uvicorn server-multi-auth:app --host 0.0.0.0 --port 3001 --workers 4 --loop uvloop`.
+# Every cache in this module is process-local and built identically by each worker.
+app = mcp.http_app(stateless_http=True)
 
 if __name__ == "__main__":
     print("Starting Enhanced Weather Service with Multi-Authentication Support...")
@@ -241,4 +597,7 @@ if __name__ == "__main__":
     print("  - SSO JWT tokens (Azure AD)")
     print("  - OAuth/JWT tokens (Adobe IMS)")
     print(f"Server running on http://0.0.0.0:3001/mcp")
+    if sys.platform != "win32":
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     mcp.run(transport="streamable-http")
\ No newline at end of file
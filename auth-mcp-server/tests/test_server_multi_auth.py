@@ -0,0 +1,36 @@
+import asyncio
+import base64
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+SERVER_PATH = Path(__file__).resolve().parent.parent / "server-multi-auth.py"
+
+
+@pytest.fixture(scope="module")
+def server():
+    # The module name contains a hyphen, so it is loaded from its path
+    spec = importlib.util.spec_from_file_location("server_multi_auth", SERVER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _nested_payload_token(depth: int = 3000) -> str:
+    payload = base64.urlsafe_b64encode(b"[" * depth).rstrip(b"=").decode()
+    return f"x.{payload}.s"
+
+
+def test_unverified_claims_ignores_deeply_nested_payload(server):
+    assert server._unverified_claims(_nested_payload_token()) == {}
+
+
+def test_verify_token_rejects_deeply_nested_payload(server):
+    assert asyncio.run(server.verifier.verify_token(_nested_payload_token())) is None
+
+
+def test_api_key_verifier_accepts_jwt_shaped_key_with_nested_payload(server):
+    api_key = _nested_payload_token()
+    api_key_verifier = server.ApiKeyVerifier(api_key)
+    assert asyncio.run(api_key_verifier.verify_token(api_key)) is not None
@@ -13,6 +13,8 @@ Usage:
 Environment:
     - MOCK_GITHUB_BASE_URL: optional base URL to override the default API host
     - GITHUB_TOKEN: optional bearer token to include in requests
+    - MOCK_GITHUB_CONNECT_TIMEOUT: seconds to wait for a connection (default 3)
+    - MOCK_GITHUB_TIMEOUT: seconds to wait for reads and writes (default 30)
 """
 
 from __future__ import annotations
@@ -21,21 +23,46 @@ import os
 import logging
 from typing import Any, Dict, List, Optional
 
-import requests
+import httpx
+import orjson
 from mcp.server.fastmcp import FastMCP
 
 
 logger = logging.getLogger("mock_github_mcp_server")
 logging.basicConfig(level=logging.INFO)
+# httpx logs every request at INFO; keep per-request logging at DEBUG as before
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 # Base URL - read from environment to make testing easier
 BASE_URL = os.environ.get("MOCK_GITHUB_BASE_URL", "https://githubmockdaservice.azurewebsites.net").rstrip("/")
-DEFAULT_TIMEOUT = float(os.environ.get("MOCK_GITHUB_TIMEOUT", "30"))
+# A short connect timeout fails fast when the host is unreachable, while slow
+# responses still get the full read timeout
+DEFAULT_TIMEOUT = httpx.Timeout(
+    float(os.environ.get("MOCK_GITHUB_TIMEOUT", "30")),
+    connect=float(os.environ.get("MOCK_GITHUB_CONNECT_TIMEOUT", "3")),
+)
+
+# Shared async client so concurrent tool calls overlap on the network and reuse
+# pooled keep-alive (HTTP/2 where the host supports it) connections. The auth
+# header is resolved once; connection failures are retried twice.
+_headers: Dict[str, str] = {}
+_token = os.environ.get("GITHUB_TOKEN") or os.environ.get("MOCK_GITHUB_TOKEN")
+if _token:
+    _headers["Authorization"] = f"Bearer {_token}"
+CLIENT = httpx.AsyncClient(
+    headers=_headers,
+    timeout=DEFAULT_TIMEOUT,
+    transport=httpx.AsyncHTTPTransport(
+        retries=2,
+        http2=True,
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+    ),
+)
 
 mcp = FastMCP("Mock GitHub (OpenAPI)", host="0.0.0.0", port=3001, stateless_http=True)
 
 
-def _request(
+async def _request(
     method: str, path: str, params: Optional[Dict[str, Any]] = None, json_body: Optional[Any] = None
 ) -> Any:
     """Helper to perform an HTTP request against the mock GitHub service.
@@ -46,24 +73,18 @@ def _request(
     """
     url = f"{BASE_URL}{path if path.startswith('/') else '/' + path}"
 
-    headers: Dict[str, str] = {}
-    token = os.environ.get("GITHUB_TOKEN") or os.environ.get("MOCK_GITHUB_TOKEN")
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-
-    # Use synchronous requests to avoid async/await complexity
     logger.debug("HTTP %s %s params=%s json=%s", method, url, params, json_body)
     try:
-        resp = requests.request(method, url, params=params, json=json_body, headers=headers, timeout=DEFAULT_TIMEOUT)
-    except requests.exceptions.Timeout:
+        resp = await CLIENT.request(method, url, params=params, json=json_body)
+    except httpx.TimeoutException:
         return {"isError": True, "message": "Request timed out", "url": url, "method": method}
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return {"isError": True, "message": f"Request failed: {e}", "url": url, "method": method}
 
-    # Try to parse JSON; fall back to raw text
+    # Try to parse JSON straight from the response bytes; fall back to raw text
     try:
-        data = resp.json()
-    except Exception:
+        data = orjson.loads(resp.content)
+    except orjson.JSONDecodeError:
         data = resp.text
 
     if resp.status_code >= 400:
@@ -81,7 +102,7 @@ def _request(
 
 # Tool: GET /issues
 @mcp.tool()
-def list_issues(
+async def list_issues(
     filter: str = "assigned",
     state: str = "open",
     labels: Optional[str] = None,
@@ -99,23 +120,24 @@ def list_issues(
     params: Dict[str, Any] = {
         "filter": filter,
         "state": state,
-        "labels": labels,
         "sort": sort,
         "direction": direction,
-        "since": since,
-        "pulls": str(pulls).lower(),
+        "pulls": "true" if pulls else "false",
         "per_page": per_page,
         "page": page,
     }
-    # Remove keys with None values
-    params = {k: v for k, v in params.items() if v is not None}
+    # Only send optional filters the caller provided
+    if labels is not None:
+        params["labels"] = labels
+    if since is not None:
+        params["since"] = since
 
-    return _request("GET", "/issues", params=params)
+    return await _request("GET", "/issues", params=params)
 
 
 # Tool: GET /repos/{owner}/{repo}/issues
 @mcp.tool()
-def list_repo_issues(
+async def list_repo_issues(
     owner: str,
     repo: str,
     milestone: Optional[str] = None,
@@ -135,38 +157,44 @@ def list_repo_issues(
     Maps to GET /repos/{owner}/{repo}/issues
     """
     params: Dict[str, Any] = {
-        "milestone": milestone,
         "state": state,
-        "assignee": assignee,
-        "creator": creator,
-        "mentioned": mentioned,
-        "labels": labels,
         "sort": sort,
         "direction": direction,
-        "since": since,
         "per_page": per_page,
         "page": page,
     }
-    params = {k: v for k, v in params.items() if v is not None}
+    # Only send optional filters the caller provided
+    if milestone is not None:
+        params["milestone"] = milestone
+    if assignee is not None:
+        params["assignee"] = assignee
+    if creator is not None:
+        params["creator"] = creator
+    if mentioned is not None:
+        params["mentioned"] = mentioned
+    if labels is not None:
+        params["labels"] = labels
+    if since is not None:
+        params["since"] = since
 
     path = f"/repos/{owner}/{repo}/issues"
-    return _request("GET", path, params=params)
+    return await _request("GET", path, params=params)
 
 
 # Tool: GET /repos/{owner}/{repo}/issues/{issue_number}
 @mcp.tool()
-def get_issue(owner: str, repo: str, issue_number: int) -> Any:
+async def get_issue(owner: str, repo: str, issue_number: int) -> Any:
     """Get a specific issue by number.
 
     Maps to GET /repos/{owner}/{repo}/issues/{issue_number}
     """
     path = f"/repos/{owner}/{repo}/issues/{issue_number}"
-    return _request("GET", path)
+    return await _request("GET", path)
 
 
 # Tool: PATCH /repos/{owner}/{repo}/issues/{issue_number}
 @mcp.tool()
-def update_issue(
+async def update_issue(
     owner: str,
     repo: str,
     issue_number: int,
@@ -183,32 +211,27 @@ def update_issue(
     Maps to PATCH /repos/{owner}/{repo}/issues/{issue_number}
     Only non-None fields are sent in the request body.
     """
-    payload: Dict[str, Any] = {}
-    if title is not None:
-        payload["title"] = title
-    if body is not None:
-        payload["body"] = body
-    if state is not None:
-        payload["state"] = state
-    if state_reason is not None:
-        payload["state_reason"] = state_reason
-    if assignees is not None:
-        payload["assignees"] = assignees
-    if labels is not None:
-        payload["labels"] = labels
-    if milestone is not None:
-        payload["milestone"] = milestone
+    fields = (
+        ("title", title),
+        ("body", body),
+        ("state", state),
+        ("state_reason", state_reason),
+        ("assignees", assignees),
+        ("labels", labels),
+        ("milestone", milestone),
+    )
+    payload: Dict[str, Any] = {name: value for name, value in fields if value is not None}
 
     if not payload:
         return {"isError": True, "message": "No update fields provided"}
 
     path = f"/repos/{owner}/{repo}/issues/{issue_number}"
-    return _request("PATCH", path, json_body=payload)
+    return await _request("PATCH", path, json_body=payload)
 
 
 # Tool: GET /repos/{owner}/{repo}/pulls
 @mcp.tool()
-def list_pull_requests(
+async def list_pull_requests(
     owner: str,
     repo: str,
     state: str = "open",
@@ -229,7 +252,7 @@ def list_pull_requests(
         "page": page,
     }
     path = f"/repos/{owner}/{repo}/pulls"
-    return _request("GET", path, params=params)
+    return await _request("GET", path, params=params)
 
 
 if __name__ == "__main__":